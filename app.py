@@ -1,4 +1,5 @@
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import psycopg2
 import plotly.express as px
@@ -8,6 +9,7 @@ import numpy as np
 from prophet import Prophet
 from prophet.plot import plot_plotly
 import plotly.graph_objs as go
+from whatif import simulate_scenario
 
 # Load environment variables
 load_dotenv()
@@ -28,7 +30,8 @@ def get_connection():
         port=DB_PORT
     )
 
-# Fetch data from database
+# Fetch data from database, cached so reruns and other sessions reuse results
+@st.cache_data(ttl=600, show_spinner=False)
 def fetch_data(query):
     conn = get_connection()
     try:
@@ -37,6 +40,22 @@ def fetch_data(query):
     finally:
         conn.close()
 
+# Shared thread pool so independent queries run concurrently, each on its own connection
+@st.cache_resource
+def get_query_executor():
+    return ThreadPoolExecutor(max_workers=8)
+
+# Start a query in the background and return its future
+def fetch_data_async(query):
+    future = get_query_executor().submit(fetch_data, query)
+    st.session_state.setdefault("pending_queries", []).append(future)
+    return future
+
+# Drop queries an interrupted rerun left queued, so they do not hold up this run
+for stale_future in st.session_state.get("pending_queries", []):
+    stale_future.cancel()
+st.session_state["pending_queries"] = []
+
 # Get booking trends data
 booking_trends_query = """
 SELECT d.arrival_year, d.arrival_month, COUNT(*) AS total_bookings
@@ -86,12 +105,29 @@ FROM dim_hotels
 ORDER BY hotel_name;
 """
 
-# Fetching Data
-df_bookings = fetch_data(booking_trends_query)
-df_cancellations = fetch_data(cancellation_query)
-df_revenue = fetch_data(revenue_query)
-df_countries = fetch_data(country_query)
-df_hotel_types = fetch_data(hotel_type_query)
+# Get historical cancellation rate and ADR per month for what-if scenarios
+whatif_history_query = """
+SELECT d.arrival_year, d.arrival_month,
+       AVG(CASE WHEN f.is_canceled = 1 THEN 1.0 ELSE 0.0 END) AS cancel_rate,
+       AVG(CASE WHEN f.is_canceled = 0 THEN f.adr END) AS avg_adr
+FROM fact_bookings f
+JOIN dim_dates d ON f.date_id = d.date_id
+GROUP BY d.arrival_year, d.arrival_month
+ORDER BY d.arrival_year, d.arrival_month;
+"""
+
+# Create a month order mapping
+month_order = {
+    'January': 1, 'February': 2, 'March': 3, 'April': 4, 'May': 5, 'June': 6,
+    'July': 7, 'August': 8, 'September': 9, 'October': 10, 'November': 11, 'December': 12
+}
+
+# Fetching Data - all queries start at once, results are collected where they are used
+bookings_future = fetch_data_async(booking_trends_query)
+cancellations_future = fetch_data_async(cancellation_query)
+revenue_future = fetch_data_async(revenue_query)
+countries_future = fetch_data_async(country_query)
+hotel_types_future = fetch_data_async(hotel_type_query)
 
 # Streamlit App Title
 st.title("🏨 Hotel Booking Dashboard")
@@ -100,20 +136,11 @@ st.title("🏨 Hotel Booking Dashboard")
 tab1, tab2 = st.tabs(["Dashboard", "Forecast"])
 
 with tab1:
-    # Sidebar Filters
-    st.sidebar.header("Filter Data")
-
-    # Add "All Years" option to year filter
-    year_options = ["All Years"] + sorted(df_bookings["arrival_year"].unique().tolist())
-    selected_year = st.sidebar.selectbox("Select Year", year_options)
-
-    # Add country filter with only high-revenue countries
-    country_options = ["All Countries"] + df_countries["country"].tolist()
-    selected_country = st.sidebar.selectbox("Select Country (Revenue > $10,000)", country_options)
-
-    # Add hotel type filter
-    hotel_options = ["All Hotels"] + df_hotel_types["hotel_name"].tolist()
-    selected_hotel = st.sidebar.selectbox("Select Hotel Type", hotel_options)
+    # Current filter selections; the sidebar widgets that set them are drawn
+    # after the charts, so the charts never wait on the filter option queries
+    selected_year = st.session_state.get("selected_year", "All Years")
+    selected_country = st.session_state.get("selected_country", "All Countries")
+    selected_hotel = st.session_state.get("selected_hotel", "All Hotels")
 
     # Modify queries to include all filters
     year_filter = ""
@@ -167,15 +194,15 @@ with tab1:
         ORDER BY d.arrival_year, d.arrival_month;
         """
         
-        # Fetch filtered data
-        df_bookings_filtered = fetch_data(booking_trends_filtered_query)
-        df_cancellations_filtered = fetch_data(cancellation_filtered_query)
-        df_revenue_filtered = fetch_data(revenue_filtered_query)
+        # Fetch filtered data concurrently
+        bookings_filtered_future = fetch_data_async(booking_trends_filtered_query)
+        cancellations_filtered_future = fetch_data_async(cancellation_filtered_query)
+        revenue_filtered_future = fetch_data_async(revenue_filtered_query)
     else:
         # Use original unfiltered data
-        df_bookings_filtered = df_bookings
-        df_cancellations_filtered = df_cancellations
-        df_revenue_filtered = df_revenue
+        bookings_filtered_future = bookings_future
+        cancellations_filtered_future = cancellations_future
+        revenue_filtered_future = revenue_future
 
     # Create a 2-column layout for the top row
     row1_col1, row1_col2 = st.columns(2)
@@ -187,11 +214,7 @@ with tab1:
 
     with row1_col1:
         st.subheader("📊 Booking Trends")
-        # Create a month order mapping
-        month_order = {
-            'January': 1, 'February': 2, 'March': 3, 'April': 4, 'May': 5, 'June': 6,
-            'July': 7, 'August': 8, 'September': 9, 'October': 10, 'November': 11, 'December': 12
-        }
+        df_bookings_filtered = bookings_filtered_future.result().copy()
         
         # If dataframe is not empty, sort by month
         if not df_bookings_filtered.empty:
@@ -221,6 +244,7 @@ with tab1:
 
     with row1_col2:
         st.subheader("❌ Cancellation Rates")
+        df_cancellations_filtered = cancellations_filtered_future.result().copy()
         # If dataframe is not empty, sort by month
         if not df_cancellations_filtered.empty:
             # Add a month_num column for sorting
@@ -258,6 +282,7 @@ with tab1:
 
     # Revenue Trends in a full-width row at the bottom
     st.subheader("💰 Revenue Trends")
+    df_revenue_filtered = revenue_filtered_future.result().copy()
     # If dataframe is not empty, sort by month
     if not df_revenue_filtered.empty:
         # Add a month_num column for sorting
@@ -285,28 +310,127 @@ with tab1:
     else:
         st.write("No revenue data available for the selected filters.")
 
+    # Sidebar Filters
+    st.sidebar.header("Filter Data")
+
+    # Add "All Years" option to year filter
+    df_bookings = bookings_future.result()
+    year_options = ["All Years"] + sorted(df_bookings["arrival_year"].unique().tolist())
+    st.sidebar.selectbox("Select Year", year_options, key="selected_year")
+
+    # Add country filter with only high-revenue countries
+    country_options = ["All Countries"] + countries_future.result()["country"].tolist()
+    st.sidebar.selectbox("Select Country (Revenue > $10,000)", country_options, key="selected_country")
+
+    # Add hotel type filter
+    hotel_options = ["All Hotels"] + hotel_types_future.result()["hotel_name"].tolist()
+    st.sidebar.selectbox("Select Hotel Type", hotel_options, key="selected_hotel")
+
 
 ### Time Series Forecasting
 
-with tab2:
-    st.header("📈 Booking Forecast")
-    
-    # Fetch historical bookings for forecasting
-    forecast_query = """
-    SELECT d.arrival_year, d.arrival_month, COUNT(*) AS total_bookings
-    FROM fact_bookings f
-    JOIN dim_dates d ON f.date_id = d.date_id
-    GROUP BY d.arrival_year, d.arrival_month
-    ORDER BY d.arrival_year, d.arrival_month;
-    """
+# Fit Prophet on the training data and predict through the forecast horizon
+@st.cache_resource(show_spinner="Training forecasting model...")
+def fit_forecast(df_train, months_to_forecast):
+    model = Prophet(yearly_seasonality=True, weekly_seasonality=False, daily_seasonality=False)
+    model.fit(df_train)
     
-    df_forecast_data = fetch_data(forecast_query)
+    # Create future dataframe that includes test period and 12 months beyond the last date
+    future = model.make_future_dataframe(periods=months_to_forecast, freq="M")
+    forecast = model.predict(future)
+    return model, forecast
+
+# Historical monthly rates, cached so scenario changes do not query again
+@st.cache_data(ttl=3600)
+def fetch_whatif_history():
+    df_history = fetch_data(whatif_history_query)
+    df_history["month"] = df_history["arrival_month"].map(month_order)
+    return df_history.dropna(subset=["month", "cancel_rate", "avg_adr"]).astype({"month": int})
+
+# Simulate a what-if scenario, cached per parameter set so slider moves are instant
+@st.cache_data(show_spinner="Simulating scenario...", max_entries=256)
+def run_scenario(df_future, df_history, cancel_rate_delta_pp, adr_change_pct, months):
+    return simulate_scenario(df_future, df_history, cancel_rate_delta_pp=cancel_rate_delta_pp,
+                             adr_change_pct=adr_change_pct, months=months)
+
+# Render the what-if scenarios as a nested fragment, so slider moves rerun
+# only the simulation and not the forecast charts and components above it
+@st.fragment
+def render_whatif(df_future):
+    st.subheader("🧪 What-If Scenarios")
+    scenario_col1, scenario_col2 = st.columns(2)
+    cancel_rate_delta_pp = scenario_col1.slider("Cancellation Rate Change (pp)", -20, 20, 0, step=1)
+    adr_change_pct = scenario_col2.slider("ADR Change (%)", -50, 50, 0, step=1)
+    scenario_months = st.multiselect("Apply to Months", list(month_order.keys()), default=list(month_order.keys()))
+    months = tuple(month_order[month] for month in scenario_months)
+
+    df_history = fetch_whatif_history()
+    baseline = run_scenario(df_future, df_history, 0, 0, tuple(month_order.values()))
+    scenario = run_scenario(df_future, df_history, cancel_rate_delta_pp, adr_change_pct, months)
+
+    fig_scenario = go.Figure()
+    fig_scenario.add_trace(go.Scatter(
+        x=scenario['ds'].tolist() + scenario['ds'].tolist()[::-1],
+        y=scenario['revenue_p90'].tolist() + scenario['revenue_p10'].tolist()[::-1],
+        fill='toself',
+        fillcolor='rgba(213, 94, 0, 0.2)',
+        line=dict(color='rgba(255, 255, 255, 0)'),
+        name='Scenario P10-P90'
+    ))
+    fig_scenario.add_trace(go.Scatter(
+        x=scenario['ds'],
+        y=scenario['revenue_p50'],
+        mode='lines+markers',
+        line=dict(color='#D55E00'),
+        name='Scenario Median'
+    ))
+    fig_scenario.add_trace(go.Scatter(
+        x=baseline['ds'],
+        y=baseline['revenue_p50'],
+        mode='lines',
+        line=dict(color='#0072B2', dash='dash'),
+        name='Baseline Median'
+    ))
+    fig_scenario.update_layout(
+        xaxis_title="Date",
+        yaxis_title="Projected Revenue",
+        legend_title="Legend",
+        hovermode="x unified"
+    )
+    st.plotly_chart(fig_scenario, use_container_width=True)
+
+    # Scenario metrics against the baseline
+    metric_col1, metric_col2 = st.columns(2)
+    scenario_revenue = scenario["revenue_mean"].sum()
+    baseline_revenue = baseline["revenue_mean"].sum()
+    scenario_net = scenario["net_bookings_mean"].sum()
+    baseline_net = baseline["net_bookings_mean"].sum()
+    metric_col1.metric("Projected Net Bookings", f"{scenario_net:,.0f}", f"{scenario_net - baseline_net:+,.0f}")
+    revenue_delta = scenario_revenue - baseline_revenue
+    metric_col2.metric("Projected Revenue", f"${scenario_revenue:,.2f}",
+                       f"{'+' if revenue_delta >= 0 else '-'}${abs(revenue_delta):,.2f}")
+
+    # Scenario bands in a table
+    scenario_table = scenario.copy()
+    scenario_table["ds"] = pd.to_datetime(scenario_table["ds"]).dt.strftime("%Y-%m")
+    scenario_table = scenario_table[["ds", "net_bookings_p10", "net_bookings_p50", "net_bookings_p90",
+                                     "revenue_p10", "revenue_p50", "revenue_p90"]].round(2)
+    scenario_table.columns = ["Month", "Net Bookings P10", "Net Bookings P50", "Net Bookings P90",
+                              "Revenue P10", "Revenue P50", "Revenue P90"]
+    for column in ["Net Bookings P10", "Net Bookings P50", "Net Bookings P90"]:
+        scenario_table[column] = scenario_table[column].round().astype(int)
+    st.dataframe(scenario_table, use_container_width=True)
+
+# Render the forecast tab as a fragment: nothing runs until it is requested,
+# and toggling it reruns only this fragment rather than the whole dashboard
+@st.fragment
+def render_forecast(forecast_future):
+    if not st.toggle("Load forecast", key="load_forecast"):
+        st.info("Turn on **Load forecast** to train the model and show the booking forecast.")
+        return
     
-    # Create month order mapping
-    month_order = {
-        'January': 1, 'February': 2, 'March': 3, 'April': 4, 'May': 5, 'June': 6,
-        'July': 7, 'August': 8, 'September': 9, 'October': 10, 'November': 11, 'December': 12
-    }
+    # Historical bookings for forecasting (same query as the booking trends)
+    df_forecast_data = forecast_future.result().copy()
     
     # Add month number for proper date conversion
     df_forecast_data['month_num'] = df_forecast_data['arrival_month'].map(month_order)
@@ -331,16 +455,10 @@ with tab2:
     # Calculate the last date in the dataset to determine future forecast start
     last_date_in_data = df_prophet['ds'].max()
     
-    # Train Prophet Model
-    with st.spinner("Training forecasting model..."):
-        model = Prophet(yearly_seasonality=True, weekly_seasonality=False, daily_seasonality=False)
-        model.fit(df_train)
-        
-        # Create future dataframe that includes test period and 12 months beyond the last date
-        months_to_forecast = (last_date_in_data.year - cutoff_date.year) * 12 + \
-                            (last_date_in_data.month - cutoff_date.month) + forecast_periods
-        future = model.make_future_dataframe(periods=months_to_forecast, freq="M")
-        forecast = model.predict(future)
+    # Train Prophet Model (cached, so fragment reruns do not refit)
+    months_to_forecast = (last_date_in_data.year - cutoff_date.year) * 12 + \
+                        (last_date_in_data.month - cutoff_date.month) + forecast_periods
+    model, forecast = fit_forecast(df_train, months_to_forecast)
     
     # Plot the forecast
     st.subheader("📈 Forecast with Train/Test Split")
@@ -480,3 +598,11 @@ with tab2:
     future_forecast["Lower Bound"] = future_forecast["Lower Bound"].round().astype(int)
     future_forecast["Upper Bound"] = future_forecast["Upper Bound"].round().astype(int)
     st.dataframe(future_forecast, use_container_width=True)
+
+    # What-if scenarios on top of the forecast
+    df_future = forecast[forecast['ds'] > testing_end_date][["ds", "yhat", "yhat_lower", "yhat_upper"]].head(forecast_periods)
+    render_whatif(df_future)
+
+with tab2:
+    st.header("📈 Booking Forecast")
+    render_forecast(bookings_future)
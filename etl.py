@@ -1,19 +1,23 @@
 import os
+import re
+import json
+import shutil
+import hashlib
+import argparse
+from contextlib import nullcontext
 import pandas as pd
 from dotenv import load_dotenv
 import httpx
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from key_resolver import KeyResolver, normalize_agent, normalize_date, normalize_int, normalize_str
 
 # Load environment variables
 load_dotenv()
-print("Environment variables loaded")
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-print(f"SUPABASE_URL exists: {'Yes' if SUPABASE_URL else 'No'}")
-print(f"SUPABASE_KEY exists: {'Yes' if SUPABASE_KEY else 'No'}")
-
 # Set up headers for Supabase REST API
 headers = {
     "apikey": SUPABASE_KEY,
@@ -21,36 +25,69 @@ headers = {
     "Content-Type": "application/json"
 }
 
-# Load and clean data
-df = pd.read_csv("/Users/bera/Desktop/data/hotel_bookings.csv")
+CSV_PATH = "/Users/bera/Desktop/data/hotel_bookings.csv"
+BATCH_SIZE = 1000
+
+# Columns that identify a booking, each cast to a fixed type before hashing.
+# Status, price and change columns (is_canceled, reservation_status,
+# reservation_status_date, adr, booking_changes, ...) are left out on purpose
+# so a refreshed extract that cancels or edits a booking keeps its key.
+BOOKING_KEY_COLUMNS = {
+    "hotel": str,
+    "arrival_date_year": int,
+    "arrival_date_month": str,
+    "arrival_date_day_of_month": int,
+    "lead_time": int,
+    "adults": int,
+    "children": int,
+    "babies": int,
+    "country": str,
+    "customer_type": str,
+    "market_segment": str,
+    "distribution_channel": str,
+    "agent": "agent",
+    "is_repeated_guest": int,
+    "previous_cancellations": int,
+    "previous_bookings_not_canceled": int,
+    "reserved_room_type": str,
+}
+
+# Local record of committed fact batches, one file per load, used to resume runs
+CHECKPOINT_DIR = ".etl_checkpoints"
+
+def load_bookings(path):
+    """Load and clean the booking extract"""
+    df = pd.read_csv(path)
 
-# Clean Data
-df = df.copy() 
-df["children"] = df["children"].fillna(0)  
-df["country"] = df["country"].fillna("Unknown")  
-df["agent"] = df["agent"].fillna(0)  
-df.drop("company", axis=1, inplace=True) 
-df["reservation_status_date"] = pd.to_datetime(df["reservation_status_date"]) 
+    # Clean Data
+    df = df.copy()
+    df["children"] = df["children"].fillna(0)
+    df["country"] = df["country"].fillna("Unknown")
+    df["agent"] = df["agent"].fillna(0)
+    df.drop("company", axis=1, inplace=True)
+    df["reservation_status_date"] = pd.to_datetime(df["reservation_status_date"])
 
-# Remove duplicate rows
-df.drop_duplicates(inplace=True)
+    # Remove duplicate rows
+    df.drop_duplicates(inplace=True)
+    return df
 
-def insert_data(table_name, records, unique_columns=None):
+def insert_data(table_name, records, unique_columns=None, client=None):
     """
     Insert data into Supabase table with upsert support
-    
+
     Args:
         table_name: Name of the table
         records: List of records to insert
         unique_columns: List of columns that form a unique constraint
+        client: Optional httpx.Client to reuse, a new one is opened otherwise
     """
     try:
         # Add Prefer header for upsert if unique_columns are specified
         request_headers = headers.copy()
         if unique_columns:
             request_headers["Prefer"] = "resolution=merge-duplicates"
-            
-        with httpx.Client() as client:
+
+        with httpx.Client() if client is None else nullcontext(client) as client:
             response = client.post(
                 f"{SUPABASE_URL}/rest/v1/{table_name}",
                 headers=request_headers,
@@ -67,11 +104,17 @@ def insert_data(table_name, records, unique_columns=None):
         print(f"❌ Error with {table_name}: {e}")
         return False
 
-def get_mapping(table_name, key_field, value_field):
-    """Get mapping with debug information"""
+def get_dimension_rows(table_name, fields):
+    """
+    Get all rows of a dimension table for key resolution
+
+    Args:
+        table_name: Name of the dimension table
+        fields: Surrogate key and natural key columns to select
+    """
     with httpx.Client() as client:
         response = client.get(
-            f"{SUPABASE_URL}/rest/v1/{table_name}?select={key_field},{value_field}",
+            f"{SUPABASE_URL}/rest/v1/{table_name}?select={','.join(fields)}",
             headers=headers
         )
         if response.status_code == 200:
@@ -79,174 +122,343 @@ def get_mapping(table_name, key_field, value_field):
             print(f"Retrieved {len(data)} mappings for {table_name}")
             if len(data) > 0:
                 print(f"Sample mapping for {table_name}:", data[0])
-            return {str(row[value_field]): row[key_field] for row in data}
+            return data
         else:
             print(f"Error getting mappings for {table_name}: {response.text}")
-        return {}
+        return []
 
-def get_customer_mapping(table_name):
-    """Get customer mapping with composite key"""
-    with httpx.Client() as client:
-        response = client.get(
-            f"{SUPABASE_URL}/rest/v1/{table_name}?select=customer_id,adults,children,babies,customer_type,country",
-            headers=headers
-        )
-        if response.status_code == 200:
-            data = response.json()
-            print(f"Retrieved {len(data)} customer mappings")
-            # Create composite key mapping
-            mapping = {}
-            for row in data:
-                key = (
-                    int(row['adults']), 
-                    int(row['children']), 
-                    int(row['babies']), 
-                    row['customer_type'], 
-                    row['country']
-                )
-                mapping[key] = row['customer_id']
-            return mapping
-        return {}
-
-# Insert dimension tables
-print("\nInserting dimension tables...")
-
-# Hotels dimension
-hotels_df = df[["hotel", "market_segment", "distribution_channel"]].drop_duplicates()
-hotels_records = [
-    {"hotel_name": row["hotel"], 
-     "market_segment": row["market_segment"],
-     "distribution_channel": row["distribution_channel"]}
-    for _, row in hotels_df.iterrows()
-]
-print(f"\nInserting {len(hotels_records)} hotel records")
-insert_data("dim_hotels", hotels_records, unique_columns=["hotel_name", "market_segment", "distribution_channel"])
-
-# 2. Dates dimension
-dates_df = df[["reservation_status_date", "arrival_date_year", "arrival_date_month", 
-               "arrival_date_week_number", "arrival_date_day_of_month"]].drop_duplicates(
-                   subset=["reservation_status_date"]  # Ensure uniqueness by date
-               )
-
-dates_records = [
-    {"arrival_date": row["reservation_status_date"].strftime('%Y-%m-%d'),
-     "arrival_year": int(row["arrival_date_year"]),  # Ensure integer
-     "arrival_month": str(row["arrival_date_month"]),  # Ensure string
-     "arrival_week_number": int(row["arrival_date_week_number"]),  # Ensure integer
-     "arrival_day_of_month": int(row["arrival_date_day_of_month"])}  # Ensure integer
-    for _, row in dates_df.iterrows()
-]
-
-# Insert with upsert
-insert_data("dim_dates", dates_records, unique_columns=["arrival_date"])
-
-# 3. Customers dimension
-customers_df = df[["adults", "children", "babies", "customer_type", "country"]].drop_duplicates()
-customers_records = [
-    {
-        "adults": int(row["adults"]),  # Convert to integer
-        "children": int(row["children"]),  # Convert to integer
-        "babies": int(row["babies"]),  # Convert to integer
-        "customer_type": row["customer_type"],
-        "country": row["country"]
-    }
-    for _, row in customers_df.iterrows()
-]
-insert_data("dim_customers", customers_records, unique_columns=["adults", "children", "babies", "customer_type", "country"])
-
-# 4. Agents dimension
-agents_df = df[["agent"]].drop_duplicates()
-agents_records = [
-    {"agent_name": str(int(row["agent"])) if pd.notnull(row["agent"]) else "Unknown"}
-    for _, row in agents_df.iterrows()
-]
-insert_data("dim_agents", agents_records, unique_columns=["agent_name"])
-
-# Get mappings with debug information
-print("\nRetrieving mappings...")
-hotel_mapping = get_mapping("dim_hotels", "hotel_id", "hotel_name")
-date_mapping = get_mapping("dim_dates", "date_id", "arrival_date")
-customer_mapping = get_customer_mapping("dim_customers")  # Use new function
-agent_mapping = get_mapping("dim_agents", "agent_id", "agent_name")
-
-print("\nMapping sizes:")
-print(f"Hotels: {len(hotel_mapping)}")
-print(f"Dates: {len(date_mapping)}")
-print(f"Customers: {len(customer_mapping)}")
-print(f"Agents: {len(agent_mapping)}")
-
-# Prepare fact records with debugging
-print("\nPreparing fact records...")
-fact_records = []
-missing_mappings = {
-    'hotel': set(),
-    'date': set(),
-    'customer': set(),
-    'agent': set()
-}
+def insert_dimensions(df):
+    """Insert all dimension tables"""
+    print("\nInserting dimension tables...")
+
+    # Hotels dimension
+    hotels_df = df[["hotel", "market_segment", "distribution_channel"]].drop_duplicates()
+    hotels_records = [
+        {"hotel_name": row["hotel"],
+         "market_segment": row["market_segment"],
+         "distribution_channel": row["distribution_channel"]}
+        for _, row in hotels_df.iterrows()
+    ]
+    print(f"\nInserting {len(hotels_records)} hotel records")
+    insert_data("dim_hotels", hotels_records, unique_columns=["hotel_name", "market_segment", "distribution_channel"])
+
+    # 2. Dates dimension
+    dates_df = df[["reservation_status_date", "arrival_date_year", "arrival_date_month",
+                   "arrival_date_week_number", "arrival_date_day_of_month"]].drop_duplicates(
+                       subset=["reservation_status_date"]  # Ensure uniqueness by date
+                   )
 
-for idx, row in df.iterrows():
-    hotel_id = hotel_mapping.get(row["hotel"])
-    date_str = row["reservation_status_date"].strftime('%Y-%m-%d')
-    date_id = date_mapping.get(date_str)
-    
-    # Create customer key matching the mapping
-    customer_key = (
-        int(row["adults"]),
-        int(row["children"]),
-        int(row["babies"]),
-        row["customer_type"],
-        row["country"]
+    dates_records = [
+        {"arrival_date": row["reservation_status_date"].strftime('%Y-%m-%d'),
+         "arrival_year": int(row["arrival_date_year"]),  # Ensure integer
+         "arrival_month": str(row["arrival_date_month"]),  # Ensure string
+         "arrival_week_number": int(row["arrival_date_week_number"]),  # Ensure integer
+         "arrival_day_of_month": int(row["arrival_date_day_of_month"])}  # Ensure integer
+        for _, row in dates_df.iterrows()
+    ]
+
+    # Insert with upsert
+    insert_data("dim_dates", dates_records, unique_columns=["arrival_date"])
+
+    # 3. Customers dimension
+    customers_df = df[["adults", "children", "babies", "customer_type", "country"]].drop_duplicates()
+    customers_records = [
+        {
+            "adults": int(row["adults"]),  # Convert to integer
+            "children": int(row["children"]),  # Convert to integer
+            "babies": int(row["babies"]),  # Convert to integer
+            "customer_type": row["customer_type"],
+            "country": row["country"]
+        }
+        for _, row in customers_df.iterrows()
+    ]
+    insert_data("dim_customers", customers_records, unique_columns=["adults", "children", "babies", "customer_type", "country"])
+
+    # 4. Agents dimension
+    agents_df = df[["agent"]].drop_duplicates()
+    agents_records = [
+        {"agent_name": str(int(row["agent"])) if pd.notnull(row["agent"]) else "Unknown"}
+        for _, row in agents_df.iterrows()
+    ]
+    insert_data("dim_agents", agents_records, unique_columns=["agent_name"])
+
+def booking_keys(df):
+    """
+    Deterministic natural key of every booking
+
+    The key is a hash of the BOOKING_KEY_COLUMNS, each cast to a fixed type
+    (ints, strings, and agents formatted like dim_agents) so it does not depend
+    on the dtypes pandas infers for a given extract. The extract has no booking
+    ID, so bookings that share all key columns are told apart by their
+    occurrence number in file order.
+
+    Returns:
+        Series of 16 character hex keys, indexed like df
+    """
+    parts = []
+    for column, kind in BOOKING_KEY_COLUMNS.items():
+        if kind == "agent":
+            parts.append(normalize_agent(df[column]))
+        elif kind is int:
+            parts.append(normalize_int(df[column]).astype(str))
+        else:
+            parts.append(df[column].astype(str))
+    canonical = parts[0].str.cat(parts[1:], sep="|")
+    occurrence = canonical.groupby(canonical).cumcount().astype(str)
+    canonical = canonical.str.cat(occurrence, sep="|")
+    hashed = pd.util.hash_pandas_object(canonical, index=False)
+    return hashed.map(lambda h: f"{h:016x}")
+
+def resolve_facts(df):
+    """
+    Resolve surrogate keys for every booking and build the fact table
+
+    Returns:
+        DataFrame with one fact_bookings row per resolvable booking, indexed
+        like df so it can be partitioned by the source columns
+    """
+    # Build key resolvers for every dimension
+    print("\nRetrieving mappings...")
+    hotel_resolver = KeyResolver(
+        get_dimension_rows("dim_hotels", ["hotel_id", "hotel_name", "market_segment", "distribution_channel"]),
+        ["hotel_name", "market_segment", "distribution_channel"], "hotel_id"
     )
-    customer_id = customer_mapping.get(customer_key)
-    
-    agent_id = agent_mapping.get(str(float(row["agent"])) if pd.notnull(row["agent"]) else "Unknown")
-    
-    if not hotel_id:
-        missing_mappings['hotel'].add(row["hotel"])
-    if not date_id:
-        missing_mappings['date'].add(date_str)
-    if not customer_id:
-        missing_mappings['customer'].add(customer_key)
-    if not agent_id:
-        missing_mappings['agent'].add(str(float(row["agent"])) if pd.notnull(row["agent"]) else "Unknown")
-    
-    if hotel_id and date_id and customer_id:
-        fact_records.append({
-            "hotel_id": hotel_id,
-            "date_id": date_id,
-            "customer_id": customer_id,
-            "agent_id": agent_id,
-            "is_canceled": bool(row["is_canceled"]),
-            "lead_time": int(row["lead_time"]),
-            "stays_in_weekend_nights": int(row["stays_in_weekend_nights"]),
-            "stays_in_week_nights": int(row["stays_in_week_nights"]),
-            "adr": float(row["adr"]),
-            "booking_changes": int(row["booking_changes"]),
-            "deposit_type": row["deposit_type"],
-            "days_in_waiting_list": int(row["days_in_waiting_list"]),
-            "required_car_parking_spaces": int(row["required_car_parking_spaces"]),
-            "total_of_special_requests": int(row["total_of_special_requests"]),
-            "reservation_status": row["reservation_status"],
-            "reservation_status_date": row["reservation_status_date"].strftime('%Y-%m-%d')
-        })
-
-    if idx % 1000 == 0:
-        print(f"Processed {idx} rows...")
-
-print("\nMissing mappings summary:")
-for key, values in missing_mappings.items():
-    print(f"{key}: {len(values)} missing mappings")
-    if len(values) > 0:
-        print(f"Sample missing {key}:", list(values)[:3])
-
-print(f"\nPrepared {len(fact_records)} fact records")
-
-# Insert fact table in batches
-BATCH_SIZE = 1000
-for i in range(0, len(fact_records), BATCH_SIZE):
-    batch = fact_records[i:i + BATCH_SIZE]
-    print(f"Inserting batch {i//BATCH_SIZE + 1} of {len(fact_records)//BATCH_SIZE + 1}")
-    insert_data("fact_bookings", batch)
+    date_resolver = KeyResolver(
+        get_dimension_rows("dim_dates", ["date_id", "arrival_date"]),
+        ["arrival_date"], "date_id",
+        normalizers={"arrival_date": normalize_date}
+    )
+    customer_resolver = KeyResolver(
+        get_dimension_rows("dim_customers", ["customer_id", "adults", "children", "babies", "customer_type", "country"]),
+        ["adults", "children", "babies", "customer_type", "country"], "customer_id",
+        normalizers={"adults": normalize_int, "children": normalize_int, "babies": normalize_int,
+                     "customer_type": normalize_str, "country": normalize_str}
+    )
+    agent_resolver = KeyResolver(
+        get_dimension_rows("dim_agents", ["agent_id", "agent_name"]),
+        ["agent_name"], "agent_id",
+        normalizers={"agent_name": normalize_agent}
+    )
+
+    print("\nMapping sizes:")
+    print(f"Hotels: {len(hotel_resolver)}")
+    print(f"Dates: {len(date_resolver)}")
+    print(f"Customers: {len(customer_resolver)}")
+    print(f"Agents: {len(agent_resolver)}")
+
+    # Resolve surrogate keys for all fact rows at once
+    print("\nPreparing fact records...")
+    hotel_ids, hotel_missing = hotel_resolver.resolve(df, ["hotel", "market_segment", "distribution_channel"])
+    date_ids, date_missing = date_resolver.resolve(df, ["reservation_status_date"])
+    customer_ids, customer_missing = customer_resolver.resolve(df)
+    agent_ids, agent_missing = agent_resolver.resolve(df, ["agent"])
+
+    missing_mappings = {
+        'hotel': df.loc[hotel_missing, "hotel"].unique(),
+        'date': df.loc[date_missing, "reservation_status_date"].dt.strftime('%Y-%m-%d').unique(),
+        'customer': df.loc[customer_missing, ["adults", "children", "babies", "customer_type", "country"]]
+                      .drop_duplicates().itertuples(index=False, name=None),
+        'agent': normalize_agent(df.loc[agent_missing, "agent"]).unique()
+    }
+
+    print("\nMissing mappings summary:")
+    for key, values in missing_mappings.items():
+        values = list(values)
+        print(f"{key}: {len(values)} missing mappings")
+        if len(values) > 0:
+            print(f"Sample missing {key}:", values[:3])
+
+    # Facts require hotel, date and customer; agent is optional
+    resolved = ~(hotel_missing | date_missing | customer_missing)
+    facts_df = df.loc[resolved]
+    fact_table = pd.DataFrame({
+        # Deterministic natural key of the source booking, so batches can be upserted
+        "booking_key": booking_keys(df).to_numpy()[resolved],
+        "hotel_id": hotel_ids[resolved],
+        "date_id": date_ids[resolved],
+        "customer_id": customer_ids[resolved],
+        "agent_id": agent_ids[resolved],
+        "is_canceled": facts_df["is_canceled"].astype(bool).to_numpy(),
+        "lead_time": facts_df["lead_time"].astype(int).to_numpy(),
+        "stays_in_weekend_nights": facts_df["stays_in_weekend_nights"].astype(int).to_numpy(),
+        "stays_in_week_nights": facts_df["stays_in_week_nights"].astype(int).to_numpy(),
+        "adr": facts_df["adr"].astype(float).to_numpy(),
+        "booking_changes": facts_df["booking_changes"].astype(int).to_numpy(),
+        "deposit_type": facts_df["deposit_type"].to_numpy(),
+        "days_in_waiting_list": facts_df["days_in_waiting_list"].astype(int).to_numpy(),
+        "required_car_parking_spaces": facts_df["required_car_parking_spaces"].astype(int).to_numpy(),
+        "total_of_special_requests": facts_df["total_of_special_requests"].astype(int).to_numpy(),
+        "reservation_status": facts_df["reservation_status"].to_numpy(),
+        "reservation_status_date": facts_df["reservation_status_date"].dt.strftime('%Y-%m-%d').to_numpy()
+    }, index=facts_df.index)
+
+    print(f"\nPrepared {len(fact_table)} fact records")
+    return fact_table
+
+def load_state(path, default):
+    """Read a local JSON state file, or default if it does not exist yet"""
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return default
+
+def save_state(path, state):
+    """Atomically write a local JSON state file"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def batch_hash(batch):
+    """
+    Deterministic hash of a fact batch's full contents
+
+    Every column is included, not just booking_key, so a refreshed extract
+    that cancels or edits a booking changes the hash and the batch is sent
+    again instead of being skipped as already committed.
+    """
+    return hashlib.sha1(json.dumps(batch, sort_keys=True, default=str).encode()).hexdigest()
+
+def upload_facts(fact_records, client=None, label="fact_bookings"):
+    """
+    Upsert fact records in batches, resuming from the last checkpoint
+
+    Every batch is upserted on booking_key and recorded in a checkpoint file
+    named after label once committed, so a rerun skips committed batches and
+    resumes at the first uncommitted one without duplicating facts.
+
+    Returns:
+        Number of batches that failed
+    """
+    checkpoint_path = os.path.join(CHECKPOINT_DIR, re.sub(r"[^\w.-]", "_", label) + ".json")
+    committed = set(load_state(checkpoint_path, []))
+
+    failed = 0
+    skipped = 0
+    total_batches = (len(fact_records) + BATCH_SIZE - 1) // BATCH_SIZE
+    for i in range(0, len(fact_records), BATCH_SIZE):
+        batch = fact_records[i:i + BATCH_SIZE]
+        key = batch_hash(batch)
+        if key in committed:
+            skipped += 1
+            continue
+        if skipped and skipped == i // BATCH_SIZE:
+            print(f"[{label}] Resuming at batch {i//BATCH_SIZE + 1}, {skipped} batches already committed")
+
+        print(f"[{label}] Inserting batch {i//BATCH_SIZE + 1} of {total_batches}")
+        if insert_data("fact_bookings", batch, unique_columns=["booking_key"], client=client):
+            committed.add(key)
+            save_state(checkpoint_path, sorted(committed))
+        else:
+            failed += 1
+
+    if skipped == total_batches and total_batches:
+        print(f"[{label}] All {total_batches} batches already committed, nothing to send")
+    return failed
+
+def shard_keys(df, shard_by):
+    """
+    Partition key of every booking
+
+    Args:
+        df: Cleaned bookings
+        shard_by: "hotel" for the hotel name, "month" for the arrival month as
+            YYYY-MM, from arrival_date_year and arrival_date_month
+    """
+    if shard_by == "hotel":
+        return df["hotel"]
+    month_number = pd.to_datetime(df["arrival_date_month"], format="%B").dt.month
+    return df["arrival_date_year"].astype(int).astype(str) + "-" + month_number.map("{:02d}".format)
+
+def load_shard(shard_name, fact_records, label):
+    """
+    Worker: upsert one shard of fact_bookings over its own connection
+
+    Rows are upserted on booking_key, so rerunning a partially loaded shard
+    never duplicates facts and never touches rows loaded from other extracts.
+
+    Returns:
+        Tuple of (shard_name, rows in shard, failed batches)
+    """
+    with httpx.Client() as client:
+        failed = upload_facts(fact_records, client=client, label=label)
+    return shard_name, len(fact_records), failed
+
+def run_sharded(df, fact_table, shard_by, workers):
+    """
+    Load fact_bookings shard by shard across a process pool
+
+    Every shard is dispatched on each run; its batch checkpoints make already
+    committed shards return without sending anything.
+
+    Returns:
+        List of shard names that failed
+    """
+    shards = dict(iter(fact_table.groupby(shard_keys(df.loc[fact_table.index], shard_by), sort=True)))
+
+    print(f"\nLoading {len(shards)} shards by {shard_by} with {workers} workers")
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                load_shard, shard_name, shard_df.to_dict("records"), f"{shard_by}-{shard_name}"
+            ): shard_name
+            for shard_name, shard_df in shards.items()
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            shard_name = futures[future]
+            try:
+                _, rows, failed = future.result()
+            except Exception as e:
+                print(f"❌ [{done}/{len(futures)}] Shard {shard_name} crashed: {e}")
+                failures.append(shard_name)
+                continue
+            if failed:
+                print(f"❌ [{done}/{len(futures)}] Shard {shard_name}: {failed} batches failed")
+                failures.append(shard_name)
+            else:
+                print(f"✅ [{done}/{len(futures)}] Shard {shard_name}: {rows} rows loaded")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Load hotel bookings into the Supabase star schema")
+    parser.add_argument("--csv", default=CSV_PATH, help="Path to the bookings extract")
+    parser.add_argument("--shard-by", choices=["hotel", "month"],
+                        help="Load facts in parallel shards by hotel name or by arrival month "
+                             "(arrival_date_year and arrival_date_month)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Worker processes for sharded loading")
+    parser.add_argument("--restart", action="store_true",
+                        help="Discard checkpoints and send every batch again")
+    args = parser.parse_args()
+
+    if args.restart:
+        shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
+
+    print("Environment variables loaded")
+    print(f"SUPABASE_URL exists: {'Yes' if SUPABASE_URL else 'No'}")
+    print(f"SUPABASE_KEY exists: {'Yes' if SUPABASE_KEY else 'No'}")
+
+    df = load_bookings(args.csv)
+    insert_dimensions(df)
+    fact_table = resolve_facts(df)
+
+    if args.shard_by:
+        failures = run_sharded(df, fact_table, args.shard_by, args.workers)
+        if failures:
+            print(f"\n❌ {len(failures)} shards failed: {', '.join(failures)}")
+            print("Rerun the same command to retry them; committed batches are skipped.")
+            raise SystemExit(1)
+    else:
+        # Upsert fact table in checkpointed batches
+        failed = upload_facts(fact_table.to_dict("records"))
+        if failed:
+            print(f"\n❌ {failed} batches failed")
+            print("Rerun the same command to resume; committed batches are skipped.")
+            raise SystemExit(1)
+
+    print("\n🎉 Data pipeline completed!")
 
-print("\n🎉 Data pipeline completed!")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional, Tuple
+
+Normalizer = Callable[[pd.Series], pd.Series]
+
+
+def normalize_int(series: pd.Series) -> pd.Series:
+    """
+    Normalize a numeric key column to nullable integers
+
+    Missing, unparseable and non-integral values become <NA>, so they resolve
+    as misses instead of matching a real dimension row
+    """
+    numeric = pd.to_numeric(series, errors="coerce")
+    return numeric.where(numeric == numeric.round()).astype("Int64")
+
+
+def normalize_str(series: pd.Series) -> pd.Series:
+    """Normalize a text key column to strings"""
+    return series.astype(str)
+
+
+def normalize_agent(series: pd.Series) -> pd.Series:
+    """
+    Normalize agent keys so the CSV's float agents (9.0) match the
+    integer-formatted agent_name values stored in dim_agents ("9")
+    """
+    numeric = pd.to_numeric(series, errors="coerce")
+    formatted = numeric.dropna().astype(np.int64).astype(str)
+    return formatted.reindex(series.index).fillna("Unknown")
+
+
+def normalize_date(series: pd.Series) -> pd.Series:
+    """Normalize date key columns to YYYY-MM-DD strings"""
+    return pd.to_datetime(series).dt.strftime("%Y-%m-%d")
+
+
+class KeyResolver:
+    """
+    Resolve natural keys of a dimension to surrogate IDs a whole column at a time.
+
+    Each key column is factorized against the dimension's own values and the
+    resulting codes are packed into a single int64 per row (mixed radix), so
+    two keys encode equal exactly when every column matches. Dimension keys are
+    kept sorted so lookups are a single np.searchsorted over the fact column
+    instead of one tuple probe per row.
+    """
+
+    def __init__(self, rows: List[dict], key_columns: List[str], id_column: str,
+                 normalizers: Optional[Dict[str, Normalizer]] = None):
+        """
+        Args:
+            rows: Dimension rows as returned by the Supabase REST API
+            key_columns: Columns that form the dimension's natural key
+            id_column: Surrogate key column to resolve to
+            normalizers: Optional per-column functions applied to both the
+                dimension values and the probed values before encoding
+        """
+        self.key_columns = list(key_columns)
+        self.id_column = id_column
+        self.normalizers = normalizers or {}
+
+        dim = pd.DataFrame(rows, columns=self.key_columns + [id_column])
+        keys = self._normalize(dim[self.key_columns])
+
+        self.vocabularies = {col: pd.Index(keys[col].dropna().unique()) for col in self.key_columns}
+        radices = [max(len(self.vocabularies[col]), 1) for col in self.key_columns]
+        capacity = 1
+        for radix in radices:
+            capacity *= radix
+        if capacity > np.iinfo(np.int64).max:
+            raise ValueError(
+                f"Natural key of {id_column} has {capacity} possible combinations, "
+                "too many to pack into int64"
+            )
+        self.multipliers = np.cumprod([1] + radices[:0:-1], dtype=np.int64)[::-1]
+
+        encoded, valid = self._encode(keys)
+        order = np.argsort(encoded[valid], kind="stable")
+        self.sorted_keys = encoded[valid][order]
+        self.sorted_ids = dim[id_column].to_numpy().astype(object)[valid][order]
+
+        if len(self.sorted_keys) > 1 and (np.diff(self.sorted_keys) == 0).any():
+            print(f"Warning: duplicate natural keys in dimension for {id_column}, keeping first")
+            keep = np.concatenate(([True], np.diff(self.sorted_keys) != 0))
+            self.sorted_keys = self.sorted_keys[keep]
+            self.sorted_ids = self.sorted_ids[keep]
+
+    def __len__(self):
+        return len(self.sorted_keys)
+
+    def _normalize(self, frame: pd.DataFrame) -> pd.DataFrame:
+        normalized = {}
+        for col in self.key_columns:
+            normalizer = self.normalizers.get(col)
+            normalized[col] = normalizer(frame[col]) if normalizer else frame[col]
+        return pd.DataFrame(normalized, index=frame.index)
+
+    def _encode(self, keys: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode normalized key columns to int64, with a mask of encodable rows"""
+        encoded = np.zeros(len(keys), dtype=np.int64)
+        valid = np.ones(len(keys), dtype=bool)
+        for col, multiplier in zip(self.key_columns, self.multipliers):
+            codes = self.vocabularies[col].get_indexer(keys[col])
+            valid &= (codes >= 0) & keys[col].notna().to_numpy()
+            encoded += np.where(codes >= 0, codes, 0).astype(np.int64) * multiplier
+        return encoded, valid
+
+    def resolve(self, frame: pd.DataFrame, columns: Optional[List[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Resolve surrogate IDs for every row of a DataFrame
+
+        Args:
+            frame: DataFrame holding the natural key columns
+            columns: Column names in frame, in key_columns order, if they differ
+
+        Returns:
+            Tuple of (ids, missing) where ids is an object array of surrogate
+            IDs (None where unresolved) and missing is a boolean mask of misses
+        """
+        columns = columns or self.key_columns
+        probe = frame[columns].set_axis(self.key_columns, axis=1)
+        encoded, valid = self._encode(self._normalize(probe))
+
+        positions = np.searchsorted(self.sorted_keys, encoded)
+        positions = np.minimum(positions, max(len(self.sorted_keys) - 1, 0))
+        if len(self.sorted_keys):
+            found = valid & (self.sorted_keys[positions] == encoded)
+        else:
+            found = np.zeros(len(encoded), dtype=bool)
+
+        ids = np.full(len(encoded), None, dtype=object)
+        ids[found] = self.sorted_ids[positions[found]]
+        return ids, ~found
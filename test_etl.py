@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+
+import etl
+
+
+def fact_records(n):
+    return [
+        {"booking_key": f"{i:016x}", "hotel_id": 1, "is_canceled": False,
+         "reservation_status": "Check-Out", "adr": 100.0}
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def posted(monkeypatch, tmp_path):
+    """Record fact batches sent by upload_facts instead of calling Supabase"""
+    batches = []
+
+    def fake_insert(table_name, records, unique_columns=None, client=None):
+        batches.append(records)
+        return True
+
+    monkeypatch.setattr(etl, "insert_data", fake_insert)
+    monkeypatch.setattr(etl, "CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setattr(etl, "BATCH_SIZE", 2)
+    return batches
+
+
+def test_rerun_skips_committed_batches(posted):
+    records = fact_records(5)
+    assert etl.upload_facts(records) == 0
+    assert len(posted) == 3
+
+    posted.clear()
+    assert etl.upload_facts(records) == 0
+    assert posted == []
+
+
+def test_rerun_resumes_after_failed_batch(posted, monkeypatch):
+    records = fact_records(6)
+    sent = []
+
+    def flaky_insert(table_name, records, unique_columns=None, client=None):
+        sent.append(records)
+        return len(sent) != 2
+
+    monkeypatch.setattr(etl, "insert_data", flaky_insert)
+    assert etl.upload_facts(records) == 1
+
+    sent.clear()
+    monkeypatch.setattr(etl, "insert_data", lambda *args, **kwargs: sent.append(args[1]) or True)
+    assert etl.upload_facts(records) == 0
+    assert sent == [records[2:4]]
+
+
+def test_edited_booking_is_sent_again(posted):
+    records = fact_records(5)
+    etl.upload_facts(records)
+
+    posted.clear()
+    refreshed = [dict(record) for record in records]
+    refreshed[3].update(is_canceled=True, reservation_status="Canceled")
+    etl.upload_facts(refreshed)
+    assert posted == [refreshed[2:4]]
+
+
+def test_booking_keys_ignore_status_and_dtype():
+    df = pd.DataFrame({column: [1, 2] for column in etl.BOOKING_KEY_COLUMNS})
+    df["hotel"] = ["City Hotel", "Resort Hotel"]
+    df["arrival_date_month"] = ["July", "August"]
+    df["is_canceled"] = [0, 0]
+    keys = etl.booking_keys(df)
+
+    edited = df.astype({"children": float, "agent": float})
+    edited["is_canceled"] = [1, 0]
+    assert etl.booking_keys(edited).tolist() == keys.tolist()
+    assert keys.nunique() == 2
+
+
+def test_booking_keys_number_identical_bookings():
+    df = pd.DataFrame({column: [1, 1] for column in etl.BOOKING_KEY_COLUMNS})
+    assert etl.booking_keys(df).nunique() == 2
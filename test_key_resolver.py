@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from key_resolver import KeyResolver, normalize_agent, normalize_int, normalize_str
+
+CUSTOMER_KEY = ["adults", "children", "babies", "customer_type", "country"]
+CUSTOMER_NORMALIZERS = {"adults": normalize_int, "children": normalize_int, "babies": normalize_int,
+                        "customer_type": normalize_str, "country": normalize_str}
+
+
+def customer_resolver():
+    rows = [
+        {"customer_id": 1, "adults": 2, "children": 0, "babies": 0, "customer_type": "Transient", "country": "PRT"},
+        {"customer_id": 2, "adults": 2, "children": 1, "babies": 0, "customer_type": "Transient", "country": "PRT"},
+        {"customer_id": 3, "adults": 1, "children": 0, "babies": 0, "customer_type": "Group", "country": "GBR"},
+        {"customer_id": 4, "adults": 0, "children": 0, "babies": 0, "customer_type": "Group", "country": "GBR"},
+    ]
+    return KeyResolver(rows, CUSTOMER_KEY, "customer_id", normalizers=CUSTOMER_NORMALIZERS)
+
+
+def test_resolves_composite_keys_with_float_counts():
+    probe = pd.DataFrame({
+        "adults": [2.0, 1.0, 2.0, 0.0],
+        "children": [1.0, 0.0, 0.0, 0.0],
+        "babies": [0, 0, 0, 0],
+        "customer_type": ["Transient", "Group", "Transient", "Group"],
+        "country": ["PRT", "GBR", "PRT", "GBR"],
+    })
+    ids, missing = customer_resolver().resolve(probe)
+    assert ids.tolist() == [2, 3, 1, 4]
+    assert not missing.any()
+
+
+def test_packed_keys_are_unique_per_combination():
+    resolver = customer_resolver()
+    assert len(resolver) == 4
+    assert len(np.unique(resolver.sorted_keys)) == 4
+
+
+def test_unknown_combination_is_a_miss():
+    # Every column value exists in the dimension, but not in this combination
+    probe = pd.DataFrame({"adults": [1], "children": [1], "babies": [0],
+                          "customer_type": ["Transient"], "country": ["GBR"]})
+    ids, missing = customer_resolver().resolve(probe)
+    assert ids.tolist() == [None]
+    assert missing.tolist() == [True]
+
+
+def test_invalid_integer_keys_are_misses_not_zero():
+    probe = pd.DataFrame({
+        "adults": [np.nan, "x", 0.5],
+        "children": [0, 0, 0],
+        "babies": [0, 0, 0],
+        "customer_type": ["Group"] * 3,
+        "country": ["GBR"] * 3,
+    })
+    ids, missing = customer_resolver().resolve(probe)
+    assert ids.tolist() == [None, None, None]
+    assert missing.all()
+
+
+def test_columns_argument_maps_frame_columns_to_key():
+    rows = [{"hotel_id": 7, "hotel_name": "City Hotel"}, {"hotel_id": 8, "hotel_name": "Resort Hotel"}]
+    resolver = KeyResolver(rows, ["hotel_name"], "hotel_id")
+    ids, missing = resolver.resolve(pd.DataFrame({"hotel": ["Resort Hotel", "Motel"]}), ["hotel"])
+    assert ids.tolist() == [8, None]
+    assert missing.tolist() == [False, True]
+
+
+def test_agent_float_keys_match_integer_names():
+    rows = [{"agent_id": 1, "agent_name": "9"}, {"agent_id": 2, "agent_name": "240"},
+            {"agent_id": 3, "agent_name": "Unknown"}]
+    resolver = KeyResolver(rows, ["agent_name"], "agent_id", normalizers={"agent_name": normalize_agent})
+    ids, missing = resolver.resolve(pd.DataFrame({"agent": [9.0, 240.0, np.nan, 14.0]}), ["agent"])
+    assert ids.tolist() == [1, 2, 3, None]
+    assert missing.tolist() == [False, False, False, True]
+
+
+def test_empty_dimension_misses_everything():
+    resolver = KeyResolver([], ["hotel_name"], "hotel_id")
+    ids, missing = resolver.resolve(pd.DataFrame({"hotel_name": ["City Hotel", "Resort Hotel"]}))
+    assert len(resolver) == 0
+    assert ids.tolist() == [None, None]
+    assert missing.all()
+
+
+def test_duplicate_dimension_keys_keep_first(capsys):
+    rows = [{"agent_id": 1, "agent_name": "9"}, {"agent_id": 2, "agent_name": "9.0"}]
+    resolver = KeyResolver(rows, ["agent_name"], "agent_id", normalizers={"agent_name": normalize_agent})
+    ids, missing = resolver.resolve(pd.DataFrame({"agent_name": ["9"]}))
+    assert len(resolver) == 1
+    assert ids.tolist() == [1]
+    assert "duplicate natural keys" in capsys.readouterr().out
+
+
+def test_ids_are_python_ints():
+    ids, _ = customer_resolver().resolve(pd.DataFrame({
+        "adults": [2], "children": [0], "babies": [0], "customer_type": ["Transient"], "country": ["PRT"]
+    }))
+    assert type(ids[0]) is int
+
+
+def test_overflowing_key_raises():
+    # 2**16 distinct values in each of 4 columns is 2**64 combinations
+    values = np.arange(2 ** 16)
+    rows = pd.DataFrame({"a": values, "b": values, "c": values, "d": values, "id": values}).to_dict("records")
+    with pytest.raises(ValueError, match="too many to pack"):
+        KeyResolver(rows, ["a", "b", "c", "d"], "id")
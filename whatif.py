@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from typing import Iterable, Optional
+
+# Prophet's default interval_width is 0.8, i.e. yhat ± 1.2816 standard deviations
+PROPHET_INTERVAL_Z = 1.2816
+
+BAND_QUANTILES = (0.1, 0.5, 0.9)
+
+
+def monthly_distributions(history: pd.DataFrame) -> pd.DataFrame:
+    """
+    Summarize historical cancellation rates and ADR per calendar month
+
+    Args:
+        history: One row per (year, month) with columns month (1-12),
+            cancel_rate (0-1) and avg_adr
+
+    Returns:
+        DataFrame indexed by month 1-12 with the mean cancel_rate and avg_adr.
+        Months without history fall back to the overall mean.
+    """
+    means = history.groupby("month")[["cancel_rate", "avg_adr"]].mean()
+    return means.reindex(range(1, 13)).fillna(history[["cancel_rate", "avg_adr"]].mean())
+
+
+def simulate_scenario(forecast: pd.DataFrame, history: pd.DataFrame,
+                      cancel_rate_delta_pp: float = 0.0, adr_change_pct: float = 0.0,
+                      months: Optional[Iterable[int]] = None, n_paths: int = 5000,
+                      seed: int = 42) -> pd.DataFrame:
+    """
+    Monte Carlo projection of net bookings and revenue under a what-if scenario
+
+    All paths are simulated at once as (n_paths, n_months) arrays:
+      - gross bookings are drawn from the forecast's normal approximation,
+        using Prophet's interval to recover the standard deviation
+      - cancellation rates and ADR are the month's historical mean plus a
+        residual resampled from all historical (year, month) deviations
+      - the scenario shifts the cancellation rate by cancel_rate_delta_pp
+        percentage points and scales ADR by adr_change_pct, in the given months
+
+    The same seed gives the same random draws for every scenario, so
+    differences between scenarios reflect the scenario, not sampling noise.
+
+    Args:
+        forecast: Prophet forecast rows to project, with ds, yhat, yhat_lower
+            and yhat_upper
+        history: Historical monthly rates, see monthly_distributions
+        cancel_rate_delta_pp: Change of the cancellation rate in percentage points
+        adr_change_pct: Relative ADR change in percent
+        months: Calendar months (1-12) the scenario applies to, all if None
+        n_paths: Number of simulated paths
+        seed: Random seed
+
+    Returns:
+        DataFrame with one row per forecast month: ds, the p10/p50/p90 of net
+        bookings and revenue, and their means
+    """
+    rng = np.random.default_rng(seed)
+    month_numbers = forecast["ds"].dt.month.to_numpy()
+    n_months = len(month_numbers)
+
+    means = monthly_distributions(history)
+    base_cancel = means["cancel_rate"].to_numpy()[month_numbers - 1]
+    base_adr = means["avg_adr"].to_numpy()[month_numbers - 1]
+
+    # Residuals of every historical month against its calendar-month mean
+    if len(history):
+        history_means = means.loc[history["month"]].to_numpy()
+        cancel_residuals = history["cancel_rate"].to_numpy() - history_means[:, 0]
+        adr_residuals = history["avg_adr"].to_numpy() / history_means[:, 1] - 1.0
+    else:
+        cancel_residuals = adr_residuals = np.zeros(1)
+
+    # Gross bookings from the forecast distribution
+    yhat = forecast["yhat"].to_numpy()
+    sigma = (forecast["yhat_upper"].to_numpy() - forecast["yhat_lower"].to_numpy()) / (2 * PROPHET_INTERVAL_Z)
+    gross = np.maximum(rng.normal(yhat, sigma, size=(n_paths, n_months)), 0.0)
+
+    # Both residuals come from the same historical month to keep their joint variation
+    residual_idx = rng.integers(len(cancel_residuals), size=(n_paths, n_months))
+    cancel = base_cancel + cancel_residuals[residual_idx]
+    adr = base_adr * (1.0 + adr_residuals[residual_idx])
+
+    # Apply the scenario to the selected months
+    applies = np.ones(n_months, dtype=bool) if months is None else np.isin(month_numbers, list(months))
+    cancel = np.clip(cancel + applies * cancel_rate_delta_pp / 100.0, 0.0, 1.0)
+    adr = np.maximum(adr * (1.0 + applies * adr_change_pct / 100.0), 0.0)
+
+    net = gross * (1.0 - cancel)
+    revenue = net * adr
+
+    net_q = np.quantile(net, BAND_QUANTILES, axis=0)
+    revenue_q = np.quantile(revenue, BAND_QUANTILES, axis=0)
+    return pd.DataFrame({
+        "ds": forecast["ds"].to_numpy(),
+        "net_bookings_p10": net_q[0],
+        "net_bookings_p50": net_q[1],
+        "net_bookings_p90": net_q[2],
+        "net_bookings_mean": net.mean(axis=0),
+        "revenue_p10": revenue_q[0],
+        "revenue_p50": revenue_q[1],
+        "revenue_p90": revenue_q[2],
+        "revenue_mean": revenue.mean(axis=0),
+    })